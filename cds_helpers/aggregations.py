@@ -0,0 +1,7 @@
+# cds_helpers/aggregations.py
+from typing import Literal, get_args
+
+# Daily aggregations build_series supports; the CLI offers the same tuple.
+# Stdlib only, so importing it never pulls in pandas.
+Agg = Literal["weighted_mean", "median", "mean"]
+AGG_CHOICES = get_args(Agg)
@@ -1,27 +1,32 @@
 # cds_helpers/aliases.py
 
+# Known reference-entity spellings in SBSDR, keyed by lowercase canonical name.
+# Extend this as needed.
+_ALIASES = {
+    "united states of america": (
+        "united states of america",
+        "united states",
+        "u.s. government",
+        "us government",
+        "u.s. sovereign",
+        "usa",
+        "u.s.a.",
+        "u.s.a",
+    ),
+}
+
+# Built once at import: O(1) membership / pandas isin without a per-call set build
+ENTITY_ALIASES = {k: frozenset(v) for k, v in _ALIASES.items()}
+
+
 def default_aliases_for_entity(user_entity: str):
     """
     Return a list of possible reference names for the same reference entity in SBSDR.
     We'll lowercase everything for comparison later.
-    Extend this as needed.
     """
-    base = user_entity.strip()
-    aliases = {
-        "united states of america": [
-            "united states of america",
-            "united states",
-            "u.s. government",
-            "us government",
-            "u.s. sovereign",
-            "usa",
-            "u.s.a.",
-        ],
-    }
-
-    key = base.lower()
-    if key in aliases:
-        return list(dict.fromkeys(aliases[key] + [key]))
+    key = user_entity.strip().lower()
+    if key in _ALIASES:
+        return list(dict.fromkeys(_ALIASES[key] + (key,)))
     else:
         # fallback: just the provided one
         return [key]
@@ -44,3 +49,19 @@ def tenor_close_enough(request_years: float, effective_date, maturity_date, tol_
         return False
     yrs = days / 365.25
     return abs(yrs - request_years) <= tol_years
+
+
+def tenor_close_enough_vec(effective_dates, maturity_dates, request_years=5.0, tol_years=1.0):
+    """
+    Vectorized tenor_close_enough: one datetime64 pass over whole columns,
+    returning a bool mask. Same rules as the scalar version: a missing date
+    (NaT) can't disprove the tenor and is kept; non-positive terms are dropped.
+    """
+    import numpy as np
+    eff = np.asarray(effective_dates, dtype="datetime64[ns]")
+    mat = np.asarray(maturity_dates, dtype="datetime64[ns]")
+    missing = np.isnat(eff) | np.isnat(mat)
+    days = (mat - eff) / np.timedelta64(1, "D")
+    with np.errstate(invalid="ignore"):
+        ok = (days > 0) & (np.abs(days / 365.25 - request_years) <= tol_years)
+    return missing | ok
@@ -1,17 +1,86 @@
 # cds_helpers/clean_aggregate.py
 from __future__ import annotations
-import io, logging, re
+import datetime as dt
+import functools, hashlib, io, itertools, logging, os, pathlib, re
 from dataclasses import dataclass
-from typing import Literal, Optional, Tuple
+from typing import Optional, Tuple
+import numpy as np
 import pandas as pd
-from .sbsdr_fetch import fetch_sbsdr_day
+from .aliases import ENTITY_ALIASES, tenor_close_enough_vec
+from .aggregations import AGG_CHOICES, Agg
+from tqdm import tqdm
+from .sbsdr_fetch import (CACHE_DIR, FRESH_DAYS, cached_fetch_sbsdr_day, iter_sbsdr_days,
+                          not_published)
+try:
+    from .sbsdr_fetch_async import fetch_many
+except ImportError:  # aiohttp not installed: async_fetch falls back to threads
+    fetch_many = None
 
 LOG = logging.getLogger("SBSR")
 
-Agg = Literal["weighted_mean", "median", "mean"]
+# First day of public SBSR dissemination (Reg SBSR compliance date); every
+# earlier day is a guaranteed-empty round trip.
+_MIN_SBSR_DATE = dt.date(2022, 2, 14)
 
-ENTITY_PAT = re.compile(r"(united\s*states\s*of\s*america|^usa$|u\.?s\.?a\.?)", re.I)
-TENOR_PAT = re.compile(r"\b5\s*[- ]?\s*y", re.I)  # match 5Y, 5-Y, 5 Years
+def _name_tokens(name: str) -> list[str]:
+    return [t for t in re.findall(r"[a-z]+", name.lower()) if t not in ("of", "the")]
+
+def _token_pattern(name: str) -> str:
+    """Anchored all-words-present regex, so word order and punctuation don't matter."""
+    return "^" + "".join(rf"(?=.*\b{re.escape(t)}\b)" for t in _name_tokens(name))
+
+@dataclass(frozen=True)
+class Target:
+    """The single-name CDS series to extract: reference entity, currency, tenor."""
+    entity: str = "United States of America"
+    currency: str = "USD"
+    tenor_years: int = 5
+
+@dataclass(frozen=True)
+class _Patterns:
+    entity: re.Pattern   # all entity words, or an exact alias; capture-free, one pass
+    words: tuple         # lowercase words the entity regex requires
+    names: tuple         # lowercase aliases long enough to test as plain substrings
+    cells: tuple         # (alias, pattern) for short aliases, which must fill a CSV cell
+    currency: re.Pattern
+
+_SHORT_ALIAS = 4  # aliases up to this long are matched as whole cells only
+
+@functools.lru_cache(maxsize=16)
+def _patterns(target: Target) -> _Patterns:
+    key = target.entity.strip().lower()
+    aliases = ENTITY_ALIASES.get(key, frozenset({key}))
+    # Token lookaheads and the whole-cell alias alternation fused into one regex,
+    # so each distinct reference name is scanned once instead of regex + strip/lower/isin
+    exact = "|".join(map(re.escape, sorted(aliases)))
+    # A bare substring test for "usa" hits most tapes somewhere ("causal"...);
+    # short aliases only count when they fill a CSV cell. Each cell pattern
+    # starts with the literal alias so re can scan for it quickly.
+    long_ = [a for a in sorted(aliases) if len(a) > _SHORT_ALIAS]
+    cells = tuple(
+        (a, re.compile(rf'{re.escape(a)}(?=\s*"?\s*(?:,|\r?$))(?<![^,"\s]{re.escape(a)})', re.M))
+        for a in sorted(aliases) if len(a) <= _SHORT_ALIAS)
+    return _Patterns(
+        entity=re.compile(rf"{_token_pattern(target.entity)}|^\s*(?:{exact})\s*$", re.I),
+        words=tuple(_name_tokens(target.entity)),
+        names=tuple(a for a in long_ if not any(b != a and b in a for b in long_)),
+        cells=cells,
+        currency=re.compile(rf"\b{re.escape(target.currency)}\b", re.I),
+    )
+
+# Tenor label -> number + unit: 5Y, 5-Y, 5 Years, 60M, P5Y
+TENOR_PAT = re.compile(r"(?<![\d.])(\d+(?:\.\d+)?)\s*[- ]?\s*([ym])", re.I)
+
+def _tenor_years(labels: pd.Index) -> np.ndarray:
+    """Tenor labels as float years (months / 12); NaN where unrecognised."""
+    parts = labels.str.extract(TENOR_PAT)
+    n = pd.to_numeric(parts[0], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    months = parts[1].str.lower().eq("m").to_numpy(dtype=bool, na_value=False)
+    return np.where(months, n / 12.0, n)
+
+# Plain lower-cased substrings, matched with regex=False ("credit" already contains "cr")
+CREDIT_TOKEN = "cr"
+CDS_TOKEN = "cds"
 
 COLMAP = {
     "date": ["tradeDate", "asOfDate", "eventDate", "executionDate", "executionTimestamp"],
@@ -21,6 +90,8 @@ COLMAP = {
     ],
     "currency": ["notionalCurrency", "priceCurrency", "currency", "dealCurrency"],
     "tenor": ["tenor", "maturityTenor", "expirationTenor", "maturityBucket"],
+    "effective": ["effectiveDate", "effective_date", "startDate"],
+    "maturity": ["maturityDate", "expirationDate", "scheduledTerminationDate", "endDate"],
     "product": ["product", "instrument", "assetSubtype"],
     "asset": ["assetClass", "assetclass", "asset_type"],
     "notional": ["notional", "notionalAmount", "priceNotional", "quantity", "reportedNotional"],
@@ -42,160 +113,517 @@ def _coerce_cols(df: pd.DataFrame) -> pd.DataFrame:
                     yield lower[k]
     return df
 
-def _first_col(df: pd.DataFrame, keys: list[str]) -> Optional[str]:
-    cols = {c.lower(): c for c in df.columns}
+def _first_in(columns, keys: list[str]) -> Optional[str]:
+    cols = {c.lower(): c for c in columns}
     for k in keys:
         if k.lower() in cols:
             return cols[k.lower()]
     # fuzzy: exact match ignoring non-letters
-    norm = {re.sub(r"[^a-z]", "", c.lower()): c for c in df.columns}
+    norm = {re.sub(r"[^a-z]", "", c.lower()): c for c in columns}
     for k in keys:
         nk = re.sub(r"[^a-z]", "", k.lower())
         if nk in norm:
             return norm[nk]
     return None
 
+@dataclass(frozen=True)
+class ColMap:
+    """Resolved header name per COLMAP role for one SBSDR column layout (None if absent)."""
+    date: str
+    reference: Optional[str]
+    currency: Optional[str]
+    tenor: Optional[str]
+    effective: Optional[str]
+    maturity: Optional[str]
+    product: Optional[str]
+    asset: Optional[str]
+    notional: Optional[str]
+    spread: Optional[str]
+
+@functools.lru_cache(maxsize=32)
+def _colmap(columns: Tuple[str, ...]) -> ColMap:
+    """
+    SBSDR headers are stable across days, so resolve each distinct layout once;
+    a changed header set is simply a new cache key.
+    """
+    picks = {role: _first_in(columns, keys) for role, keys in COLMAP.items()}
+    picks["date"] = picks["date"] or "tradeDate"
+    return ColMap(**picks)
+
+def _norm_col(c) -> str:
+    return re.sub(r"[^a-z]", "", str(c).lower())
+
+# Every header the filters can pick (same normalisation as _first_in's fuzzy pass);
+# all other columns are dropped at parse time.
+WANTED = {_norm_col(k) for keys in COLMAP.values() for k in keys}
+# Low-cardinality text the filters only test per distinct value: parse these as
+# categoricals so no per-cell string objects are built and factorize is free.
+CATEGORICAL = {_norm_col(k) for role in ("reference", "currency", "tenor", "product", "asset")
+               for k in COLMAP[role]}
+
+def _read_projected(text: str, usecols: Optional[list[str]],
+                    cats: list[str] = ()) -> pd.DataFrame:
+    """
+    Arrow's multithreaded CSV reader when pyarrow is installed, keeping the
+    columns Arrow-backed (pd.ArrowDtype) so string kernels run in C++;
+    otherwise pandas' C engine. Columns in `cats` come back as pandas categoricals.
+    """
+    try:
+        import pyarrow as pa
+        from pyarrow import csv as pacsv
+    except ImportError:
+        df = pd.read_csv(io.StringIO(text), usecols=usecols,
+                         dtype={c: "category" for c in cats})
+        return df.rename(columns=str.strip)
+    opts = pacsv.ConvertOptions(strings_can_be_null=True)
+    if usecols:
+        opts.include_columns = usecols
+    opts.column_types = {c: pa.dictionary(pa.int32(), pa.string()) for c in cats}
+    table = pacsv.read_csv(io.BytesIO(text.encode("utf-8")), convert_options=opts)
+    # Padded headers (' tradeDate') would miss COLMAP's exact-name picks; strip
+    # them on the Arrow schema so the pandas Index is built once, already clean
+    names = [c.strip() for c in table.column_names]
+    if names != table.column_names:
+        table = table.rename_columns(names)
+    return _arrow_to_pandas(table)
+
+def _arrow_to_pandas(table) -> pd.DataFrame:
+    import pyarrow as pa
+    # Dictionary columns keep pandas' default (Categorical) conversion
+    return table.to_pandas(
+        types_mapper=lambda t: None if pa.types.is_dictionary(t) else pd.ArrowDtype(t))
+
+# Parsed days are cached as Parquet next to the raw CSVs (pyarrow only). The tag
+# changes whenever the projected/categorical column sets or the reader's output
+# format (_PARSED_FORMAT) do, so stale files are simply never looked up.
+_PARSED_FORMAT = 2  # 2: header names stripped
+_PARSED_TAG = hashlib.sha1(
+    repr((sorted(WANTED), sorted(CATEGORICAL), _PARSED_FORMAT)).encode()).hexdigest()[:8]
+
+def _parsed_path(day: str, cache_dir) -> pathlib.Path:
+    return pathlib.Path(cache_dir) / day[:4] / day[:7] / f"{day}.{_PARSED_TAG}.parquet"
+
+def _read_parsed(path: pathlib.Path) -> Optional[pd.DataFrame]:
+    try:
+        import pyarrow.parquet as pq
+        return _arrow_to_pandas(pq.read_table(path))
+    except ImportError:
+        return None
+    except Exception as e:
+        LOG.warning("Unreadable parsed cache %s: %s", path, repr(e))
+        return None
+
+def _write_parsed(path: pathlib.Path, df: pd.DataFrame) -> None:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        return
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp, compression="zstd")
+        os.replace(tmp, path)
+    except Exception as e:
+        LOG.warning("Could not write parsed cache %s: %s", path, repr(e))
+
 def _read_csv(text: str) -> Optional[pd.DataFrame]:
     if not text or "," not in text:
         return None
     try:
-        df = pd.read_csv(io.StringIO(text))
-        if df.empty or len(df.columns) < 3:
+        # Cheap header sniff on the first line only (no copy of the whole body),
+        # then parse only the columns COLMAP can use
+        header = pd.read_csv(io.StringIO(text.partition("\n")[0]), nrows=0).columns
+        if len(header) < 3:
             return None
-        return df
+        usecols = [c for c in header if _norm_col(c) in WANTED] or None
+        cats = [c for c in usecols or () if _norm_col(c) in CATEGORICAL]
+        df = _read_projected(text, usecols, cats)
+        return None if df.empty else df
     except Exception:
         # Some days contain stray BOM/lines; try python engine / skipbadlines
         try:
             df = pd.read_csv(io.StringIO(text), engine="python", on_bad_lines="skip")
-            return df if not df.empty else None
+            return df.rename(columns=str.strip) if not df.empty else None
         except Exception:
             return None
 
-def _filter_usa_usd_5y(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    # Standardize column picks
-    c_date = _first_col(df, COLMAP["date"]) or "tradeDate"
-    c_ref  = _first_col(df, COLMAP["reference"])
-    c_ccy  = _first_col(df, COLMAP["currency"])
-    c_ten  = _first_col(df, COLMAP["tenor"])
-    c_prod = _first_col(df, COLMAP["product"])
-    c_ast  = _first_col(df, COLMAP["asset"])
-    c_not  = _first_col(df, COLMAP["notional"])
-    c_spr  = _first_col(df, COLMAP["spread"])
-
-    # Lowercase string cols safely
-    for c in [c_ref, c_ccy, c_ten, c_prod, c_ast]:
-        if c and c in df.columns:
-            df[c] = df[c].astype(str)
+def _match_distinct(s: pd.Series, pred) -> np.ndarray:
+    """
+    Evaluate a string predicate once per distinct value and broadcast it back
+    through the factorized codes. SBSDR text columns (asset class, currency,
+    tenor, ...) hold a handful of values repeated over thousands of rows.
+    Missing values never match.
+    """
+    codes, uniques = pd.factorize(s)
+    if len(uniques) == 0:
+        return np.zeros(len(s), dtype=bool)
+    hit = np.asarray(pred(pd.Index(uniques).astype(str)), dtype=bool)
+    return np.append(hit, False)[codes]  # code -1 (missing) picks the trailing False
 
-    # Asset must be Credit/CDS-ish
-    if c_ast in df and df[c_ast].notna().any():
-        df = df[df[c_ast].str.contains("credit|cr", case=False, regex=True)]
-    if c_prod in df and df[c_prod].notna().any():
-        df = df[df[c_prod].str.contains("cds", case=False, regex=True)]
-
-    # Reference entity contains USA
-    if c_ref in df:
-        df = df[df[c_ref].str.contains(ENTITY_PAT, na=False)]
-    else:
-        # If we cannot see the reference name, we can't assert USA—return empty
+def _dt64(s: pd.Series) -> np.ndarray:
+    """Naive datetime64[ns] view of a date column (unparseable -> NaT)."""
+    return pd.to_datetime(s, errors="coerce", utc=True).dt.tz_convert(None).to_numpy()
+
+def _to_number(s: pd.Series) -> pd.Series:
+    """
+    Float view of an amount column. Columns the parser already typed as numeric
+    pass straight through; text gets thousands separators and the '+' that
+    SBSDR appends to capped notionals ('1,000,000+') stripped in one pass.
+    """
+    if not pd.api.types.is_numeric_dtype(s):
+        s = pd.to_numeric(s.astype(str).str.replace(r"[,+\s]", "", regex=True), errors="coerce")
+    # Plain float64 with NaN, whatever backend (numpy / nullable / Arrow) parsed it
+    return pd.Series(s.to_numpy(dtype=np.float64, na_value=np.nan), index=s.index)
+
+def _filter_trades(df: pd.DataFrame, target: Target) -> pd.DataFrame:
+    pats = _patterns(target)
+    # Standardize column picks (memoized per header layout)
+    cm = _colmap(tuple(df.columns))
+    c_date, c_ref, c_ccy, c_ten = cm.date, cm.reference, cm.currency, cm.tenor
+    c_prod, c_ast, c_not, c_spr = cm.product, cm.asset, cm.notional, cm.spread
+
+    # If we cannot see the reference name we can't assert the entity; without a date we can't bucket
+    if c_ref is None or c_date not in df:
         return df.iloc[0:0].copy()
 
-    # Currency USD if we can see it
+    # AND every predicate into one mask and select once, instead of a copy per filter
+    mask = np.ones(len(df), dtype=bool)
+    # Asset must be Credit/CDS-ish
+    if c_ast in df:
+        mask &= _match_distinct(df[c_ast], lambda v: v.str.lower().str.contains(CREDIT_TOKEN, regex=False, na=False))
+    if c_prod in df:
+        mask &= _match_distinct(df[c_prod], lambda v: v.str.lower().str.contains(CDS_TOKEN, regex=False, na=False))
+
+    # Reference entity: token regex, or an exact known alias
+    mask &= _match_distinct(df[c_ref], lambda v: v.str.contains(pats.entity, na=False))
+
+    # Currency if we can see it
     if c_ccy in df:
-        df = df[df[c_ccy].str.upper().str.contains(r"\bUSD\b", na=False)]
+        mask &= _match_distinct(df[c_ccy], lambda v: v.str.contains(pats.currency, na=False))
 
-    # Tenor ~5Y if any tenor column exists; otherwise keep all (we'll downselect by maturity bucket if present)
-    if c_ten in df and df[c_ten].notna().any():
-        df = df[df[c_ten].str.contains(TENOR_PAT, na=False)]
+    # Tenor from the tenor column, else from effective/maturity dates; otherwise keep all
+    if c_ten in df:
+        mask &= _match_distinct(df[c_ten], lambda v: np.isclose(_tenor_years(v), target.tenor_years))
+    elif cm.effective in df and cm.maturity in df:
+        mask &= tenor_close_enough_vec(_dt64(df[cm.effective]), _dt64(df[cm.maturity]),
+                                       float(target.tenor_years))
 
-    # Guard: must have a date column
-    if c_date not in df:
-        return df.iloc[0:0].copy()
+    # Materialize once: only the surviving rows and the columns the output needs
+    keep_cols = [c for c in dict.fromkeys((c_date, c_not, c_spr)) if c in df]
+    sub = df.loc[mask, keep_cols]
 
-    # Coerce numeric for notional/spread candidates
-    if c_not in df:
-        df[c_not] = pd.to_numeric(df[c_not], errors="coerce")
-    if c_spr in df:
-        df[c_spr] = pd.to_numeric(df[c_spr], errors="coerce")
+    # Coerce numeric for notional/spread candidates (on the survivors only)
+    notional = _to_number(sub[c_not]) if c_not in sub else None
+    spread = _to_number(sub[c_spr]) if c_spr in sub else None
 
     # Drop rows where both notional and spread are missing
-    if c_not in df and c_spr in df:
-        df = df[(df[c_not].notna()) | (df[c_spr].notna())]
+    if notional is not None and spread is not None:
+        both = (notional.notna() | spread.notna()).to_numpy()
+        sub, notional, spread = sub[both], notional[both], spread[both]
 
     # Standardize output columns
-    out = pd.DataFrame()
-    out["date"] = pd.to_datetime(df[c_date], errors="coerce").dt.date
-    out["entity"] = "United States of America"
-    out["currency"] = "USD"
-    out["tenor_years"] = 5
-
-    if c_not in df:
-        out["notional"] = df[c_not].fillna(0.0)
-    else:
-        out["notional"] = 0.0
+    out = pd.DataFrame({"date": pd.to_datetime(sub[c_date], errors="coerce").dt.date})
+    out["entity"] = target.entity
+    out["currency"] = target.currency
+    out["tenor_years"] = target.tenor_years
+    out["notional"] = notional.fillna(0.0) if notional is not None else 0.0
+    out["spread_bps"] = spread if spread is not None else np.nan
+
+    return out.dropna(subset=["date"])
 
-    if c_spr in df:
-        out["spread_bps"] = df[c_spr]
+def _aggregate(trades: pd.DataFrame, agg: Agg, target: Target) -> pd.DataFrame:
+    """Aggregate filtered trades per date in one groupby pass."""
+    if agg == "weighted_mean":
+        # Only rows that actually carry a quote may contribute weight; the
+        # per-date num/den sums ride along in the same segmented reduction.
+        x = trades["spread_bps"]
+        w = trades["notional"].where(x.notna())
+        out = trades.assign(num=x * w, den=w).groupby("date", sort=True).agg(
+            trades=("notional", "size"), notional=("notional", "sum"),
+            num=("num", "sum"), den=("den", "sum"))
+        price = (out["num"] / out["den"]).where(out["den"] > 0)
     else:
-        out["spread_bps"] = pd.NA
+        out = trades.groupby("date", sort=True).agg(
+            trades=("notional", "size"), notional=("notional", "sum"),
+            price=("spread_bps", agg))
+        price = out["price"]
 
-    return out.dropna(subset=["date"])
+    return pd.DataFrame({
+        "date": out.index,
+        "entity": target.entity,
+        "tenor_years": target.tenor_years,
+        "currency": target.currency,
+        "trades": out["trades"].to_numpy(),
+        "notional": out["notional"].to_numpy(dtype=np.float64),
+        f"price_bps_{agg}": price.reindex(out.index).to_numpy(dtype=np.float64),
+    })
+
+_SCAN_CHUNK = 1 << 16
+_SCAN_OVERLAP = 64  # longer than any entity word or alias, so none straddles unseen
+_NON_BLANK = re.compile(r"\S")
+_NEXT_LINE = re.compile(r"\n\s*\S")  # a non-blank line after the header
+
+def _may_match(txt: str, pats: _Patterns) -> bool:
+    """
+    Cheap pre-parse check on the raw text: a header-only file, or one where
+    neither all entity words nor any alias occur anywhere, can't yield a row.
+    Lower-cases one overlapping chunk at a time rather than copying the body.
+    """
+    first = _NON_BLANK.search(txt)
+    if first is None or _NEXT_LINE.search(txt, first.start()) is None:
+        return False
+    words = set(pats.words)
+    for i in range(0, len(txt), _SCAN_CHUNK):
+        low = txt[max(0, i - _SCAN_OVERLAP):i + _SCAN_CHUNK].lower()
+        words = {w for w in words if w not in low}
+        if not words or any(a in low for a in pats.names):
+            return True
+        if any(a in low and p.search(low) for a, p in pats.cells):
+            return True
+    return False
+
+def _process_day(txt: Optional[str], target: Target,
+                 parsed_path: Optional[pathlib.Path] = None) -> Optional[pd.DataFrame]:
+    """
+    Parse and filter one day's raw CSV text; None if nothing survives.
+    The parsed frame is also saved to `parsed_path` when one is given.
+    """
+    if not txt or not _may_match(txt, _patterns(target)):
+        return None
+    dfraw = _read_csv(txt)
+    if dfraw is None or dfraw.empty:
+        return None
+    if parsed_path is not None:
+        _write_parsed(parsed_path, dfraw)
+    ser = _filter_trades(dfraw, target)
+    return None if ser.empty else ser
+
+def _settled(day: str) -> bool:
+    """True once upstream can no longer amend the day (same rule as the raw cache)."""
+    return dt.date.fromisoformat(day) < dt.date.today() - dt.timedelta(days=FRESH_DAYS)
 
-def build_series(start_date: str, end_date: str, agg: Agg = "weighted_mean") -> pd.DataFrame:
+def _as_date(x) -> dt.date:
+    """A date from a date/datetime or a string; ISO strings take the C fast path."""
+    if isinstance(x, dt.datetime):
+        return x.date()
+    if isinstance(x, dt.date):
+        return x
+    try:
+        return dt.date.fromisoformat(str(x))
+    except ValueError:
+        return pd.to_datetime(x).date()
+
+def _clip_start(start: dt.date) -> dt.date:
+    if start < _MIN_SBSR_DATE:
+        LOG.warning("Clipped start from %s to SBSR go-live %s", start, _MIN_SBSR_DATE)
+        return _MIN_SBSR_DATE
+    return start
+
+def _days(start, end, business_days_only: bool = True) -> list[str]:
+    """
+    ISO day strings in [start, end], built as one datetime64[D] array. Weekends
+    are dropped unless business_days_only is False. US holidays are kept: CDS
+    dealers trade on Columbus and Veterans Day, and London desks trade USD
+    sovereign CDS on every US holiday, so any of them can have a file.
+    """
+    days = np.arange(np.datetime64(start, "D"), np.datetime64(end, "D") + 1)
+    if business_days_only:
+        days = days[np.is_busday(days)]
+    return np.datetime_as_string(days, unit="D").tolist()
+
+def sbsdr_days(start, end, business_days_only: bool = True) -> list[str]:
+    """
+    ISO day strings in [start, end] that can carry an SBSR file: the start is
+    clipped to go-live, and weekends are dropped unless business_days_only is False.
+    """
+    return _days(_clip_start(_as_date(start)), _as_date(end), business_days_only)
+
+def _fetch_many_iter(batch: list[str], max_workers: int, cache_dir):
+    """iter_sbsdr_days's contract over the aiohttp fetcher (needs aiohttp)."""
+    return iter(fetch_many(batch, max_workers, cache_dir).items())
+
+def _empty_series(agg: Agg) -> pd.DataFrame:
+    return pd.DataFrame(columns=["date","entity","tenor_years","currency","trades","notional",f"price_bps_{agg}"])
+
+def _run_days(days: list[str], agg: Agg, target: Target, concurrency: int,
+              cache_dir, fetch_range) -> Tuple[pd.DataFrame, list[str]]:
+    """
+    Fetch, filter and aggregate `days` (ISO strings, ascending) into series rows.
+    Also returns the days whose fetch failed (no text, and no 404 from ICE):
+    their missing rows are not a finding and must not be cached as one.
     """
-    Iterate days, fetch CSV, filter for USA 5Y USD single-name CDS, aggregate by day.
+    parts, failed = [], []
+    progress = tqdm(total=len(days), unit="day", disable=None)
+    # One calendar month per batch: enough days to keep `concurrency` fetches busy
+    # while bounding how many raw CSVs are held in memory at once. Days are filtered
+    # in order as they arrive, and each batch is aggregated as soon as it is done,
+    # so only one month of trades is alive.
+    for _, batch in itertools.groupby(days, key=lambda ds: ds[:7]):
+        batch = list(batch)
+        LOG.info("[SBSR] Fetch %s..%s (%d days)", batch[0], batch[-1], len(batch))
+        # Settled days parsed on an earlier run skip the download/decompress and
+        # CSV parse entirely; only the rest go to the fetcher, still in order.
+        paths = {ds: _parsed_path(ds, cache_dir) for ds in batch if cache_dir and _settled(ds)}
+        hits = {ds for ds, p in paths.items() if p.exists()}
+        fetched = fetch_range([ds for ds in batch if ds not in hits],
+                              max_workers=concurrency, cache_dir=cache_dir)
+        frames, dates = [], []
+        for ds in batch:
+            dfraw = _read_parsed(paths[ds]) if ds in hits else None
+            if dfraw is not None:
+                ser = _filter_trades(dfraw, target)
+                ser = None if ser.empty else ser
+            else:
+                if ds in hits:  # unreadable cache file: fall back to the raw CSV
+                    txt = cached_fetch_sbsdr_day(ds, cache_dir)
+                else:
+                    _, txt = next(fetched)
+                if txt is None and not not_published(ds):
+                    failed.append(ds)
+                ser = _process_day(txt, target, paths.get(ds))
+            if ser is not None:
+                frames.append(ser)
+                dates.append(dt.date.fromisoformat(ds))
+            progress.update()
+        if frames:
+            trades = pd.concat(frames, ignore_index=True)
+            # Bucket by the file's trade date, as the per-day rows always were;
+            # stamped once for the batch rather than copying each day's frame
+            trades["date"] = np.repeat(np.array(dates, dtype=object), [len(f) for f in frames])
+            parts.append(_aggregate(trades, agg, target))
+    progress.close()
+
+    if not parts:
+        return _empty_series(agg), failed
+    return pd.concat(parts, ignore_index=True), failed
+
+# Finished series rows are cached per (target, agg, calendar) together with the
+# settled calendar range they cover, so a rerun only computes the days outside it.
+# Bump _FILTER_VERSION whenever the selected rows or their values change
+# (_filter_trades, _to_number, ...); the alias table and tenor pattern are
+# keyed directly.
+_COVERED = b"cds_covered"
+_FILTER_VERSION = 3  # 2: US holidays no longer skipped; 3: spreads not rescaled
+_SERIES_TAG = hashlib.sha1(repr((
+    _PARSED_TAG, _FILTER_VERSION, TENOR_PAT.pattern,
+    sorted((k, sorted(v)) for k, v in ENTITY_ALIASES.items()),
+)).encode()).hexdigest()[:8]
+
+def _series_path(cache_dir, target: Target, agg: Agg, business_days_only: bool) -> pathlib.Path:
+    key = repr((target.entity.strip().lower(), target.currency.strip().upper(),
+                float(target.tenor_years), agg, business_days_only, _SERIES_TAG))
+    return pathlib.Path(cache_dir) / "series" / f"{hashlib.sha1(key.encode()).hexdigest()[:12]}.parquet"
+
+def _read_series(path: pathlib.Path) -> Optional[Tuple[pd.DataFrame, dt.date, dt.date]]:
+    if not path.exists():
+        return None
+    try:
+        import pyarrow.parquet as pq
+        table = pq.read_table(path)
+        lo, hi = (table.schema.metadata or {})[_COVERED].decode().split("..")
+        return table.to_pandas(), dt.date.fromisoformat(lo), dt.date.fromisoformat(hi)
+    except ImportError:
+        return None
+    except Exception as e:
+        LOG.warning("Unreadable series cache %s: %s", path, repr(e))
+        return None
+
+def _write_series(path: pathlib.Path, df: pd.DataFrame, lo: dt.date, hi: dt.date) -> None:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        return
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        meta = {**(table.schema.metadata or {}), _COVERED: f"{lo}..{hi}".encode()}
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        pq.write_table(table.replace_schema_metadata(meta), tmp)
+        os.replace(tmp, path)
+    except Exception as e:
+        LOG.warning("Could not write series cache %s: %s", path, repr(e))
+
+def build_series(start_date: str, end_date: str, agg: Agg = "weighted_mean",
+                 concurrency: int = 16, cache_dir=CACHE_DIR,
+                 business_days_only: bool = True, *,
+                 entity: str = "United States of America", currency: str = "USD",
+                 tenor_years: int = 5, async_fetch: bool = False) -> pd.DataFrame:
+    """
+    Iterate days, fetch CSV, filter for one single-name CDS (entity, currency,
+    tenor; USA 5Y USD by default), aggregate by day.
+    Fetches run concurrently (at most `concurrency` in flight) since each day is
+    an independent, latency-bound HTTP request. Raw CSVs, and the parsed columns
+    of settled days (as Parquet, when pyarrow is installed), are cached under
+    `cache_dir` (pass None to always hit the network), as are the finished rows
+    of settled days: a rerun only computes the days its cached range doesn't
+    cover. Weekends are skipped unless `business_days_only` is False; a start
+    before SBSR go-live (2022-02-14) is clipped to it. With `async_fetch` each
+    month is downloaded on one aiohttp event loop instead of a thread pool
+    (needs aiohttp; falls back to threads without it).
     Returns DataFrame with columns:
       date, entity, tenor_years, currency, trades, notional, price_bps_<agg>
     """
-    from datetime import date, timedelta
-    s = pd.to_datetime(start_date).date()
-    e = pd.to_datetime(end_date).date()
+    if agg not in AGG_CHOICES:
+        raise ValueError(f"agg must be one of {AGG_CHOICES}, got {agg!r}")
+    target = Target(entity, currency, tenor_years)
+    s, e = _as_date(start_date), _as_date(end_date)
     if e < s:
         raise ValueError("end_date before start_date")
+    s = _clip_start(s)
+    if e < s:
+        return _empty_series(agg)
 
-    rows = []
-    d = s
-    while d <= e:
-        ds = d.isoformat()
-        LOG.info("[SBSR] Fetch %s", ds)
-        txt = fetch_sbsdr_day(ds)
-        if txt:
-            dfraw = _read_csv(txt)
-        else:
-            dfraw = None
-
-        if dfraw is not None and not dfraw.empty:
-            ser = _filter_usa_usd_5y(dfraw)
-            if not ser.empty:
-                # daily aggregation
-                trades = len(ser)
-                notional = ser["notional"].fillna(0.0).sum()
-                if agg == "weighted_mean" and ser["spread_bps"].notna().any() and notional > 0:
-                    price = (ser["spread_bps"].fillna(0.0) * ser["notional"].fillna(0.0)).sum() / max(notional, 1e-12)
-                elif agg == "median" and ser["spread_bps"].notna().any():
-                    price = ser["spread_bps"].median()
-                elif agg == "mean" and ser["spread_bps"].notna().any():
-                    price = ser["spread_bps"].mean()
-                else:
-                    price = None
-
-                rows.append({
-                    "date": ser["date"].iloc[0],
-                    "entity": "United States of America",
-                    "tenor_years": 5,
-                    "currency": "USD",
-                    "trades": trades,
-                    "notional": float(notional),
-                    f"price_bps_{agg}": (None if price is None else float(price)),
-                })
-        d += timedelta(days=1)
-
-    if not rows:
-        return pd.DataFrame(columns=["date","entity","tenor_years","currency","trades","notional",f"price_bps_{agg}"])
-
-    out = pd.DataFrame(rows).sort_values("date")
-    out["date"] = pd.to_datetime(out["date"]).dt.date
-    # De-duplicate per day (keep last non-null)
-    out = out.drop_duplicates(subset=["date"], keep="last")
-    return out
+    if async_fetch and fetch_many is None:
+        LOG.warning("aiohttp not installed; fetching with threads")
+    fetch_range = _fetch_many_iter if async_fetch and fetch_many else iter_sbsdr_days
+
+    def run(lo: dt.date, hi: dt.date) -> Tuple[pd.DataFrame, list[str]]:
+        return _run_days(_days(lo, hi, business_days_only), agg, target,
+                         concurrency, cache_dir, fetch_range)
+
+    if not cache_dir:
+        return run(s, e)[0]
+
+    one = dt.timedelta(days=1)
+    last_settled = dt.date.today() - dt.timedelta(days=FRESH_DAYS) - one
+    path = _series_path(cache_dir, target, agg, business_days_only)
+    cached = _read_series(path)
+    if cached is None or e < cached[1] - one or s > cached[2] + one:
+        # Nothing usable (or a disjoint range): compute it all, start a new cache
+        lo, hi, old = s, e, _empty_series(agg)
+        pieces = [(s, e)]
+    else:
+        old, lo, hi = cached
+        pieces = [(a, b) for a, b in ((s, lo - one), (hi + one, e)) if a <= b]
+    anchor = lo  # start of the cached range, or of the new one
+    lo, hi = min(s, lo), max(e, hi)
+    if cached is not None:
+        LOG.info("[SBSR] Series cache covers %s..%s; computing %s", cached[1], cached[2],
+                 ", ".join(f"{a}..{b}" for a, b in pieces) or "nothing")
+    runs = [run(a, b) for a, b in pieces]
+    new = [f for f, _ in runs]
+    failed = sorted(d for _, f in runs for d in map(dt.date.fromisoformat, f) if d <= last_settled)
+
+    rows = pd.concat([f for f in [old, *new] if not f.empty] or [_empty_series(agg)],
+                     ignore_index=True)
+    rows = rows.sort_values("date", kind="stable").reset_index(drop=True)
+    hi = min(hi, last_settled)
+    if failed:
+        # Cover only the failure-free stretch around the old range (or from the
+        # start), so a rerun fetches the failed days again.
+        before = [d for d in failed if d < anchor]
+        after = [d for d in failed if d >= anchor]
+        lo = before[-1] + one if before else lo
+        hi = min(hi, after[0] - one) if after else hi
+        LOG.warning("[SBSR] %d day(s) failed to fetch (first %s); caching %s",
+                    len(failed), failed[0], f"{lo}..{hi} only" if lo <= hi else "nothing")
+    if pieces and lo <= hi:
+        _write_series(path, rows[(rows["date"] >= lo) & (rows["date"] <= hi)], lo, hi)
+    return rows[(rows["date"] >= s) & (rows["date"] <= e)].reset_index(drop=True)
+
+# The published series: US sovereign, USD, 5Y
+build_series_usa_usd_5y = functools.partial(
+    build_series, entity="United States of America", currency="USD", tenor_years=5
+)
@@ -0,0 +1,70 @@
+# cds_helpers/cli.py
+from __future__ import annotations
+import argparse, datetime as dt, logging, pathlib
+from .aggregations import AGG_CHOICES
+
+LOG = logging.getLogger("SBSR")
+
+DATE_ARG = dt.date.fromisoformat
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--start", type=DATE_ARG, required=True, help="First trade date (YYYY-MM-DD)")
+    ap.add_argument("--end", type=DATE_ARG, required=True, help="Last trade date (YYYY-MM-DD)")
+    ap.add_argument("--agg", choices=AGG_CHOICES, default="weighted_mean")
+    ap.add_argument("--out",
+                    help="Output CSV path (a .gz/.bz2/.xz suffix compresses it); not used with --probe")
+    ap.add_argument("--entity", default="United States of America", help="Reference entity name")
+    ap.add_argument("--currency", default="USD")
+    ap.add_argument("--tenor-years", type=int, default=5)
+    ap.add_argument("--concurrency", type=int, default=16, help="Max in-flight day fetches")
+    ap.add_argument("--cache-dir", default="data/raw", help="Raw CSV cache directory ('' disables)")
+    ap.add_argument("--all-days", action="store_true", help="Also fetch weekends")
+    ap.add_argument("--async-fetch", action="store_true",
+                    help="Download each month on one aiohttp event loop (needs aiohttp)")
+    ap.add_argument("--probe", action="store_true",
+                    help="Only report which days ICE has published (HEAD requests), then exit")
+    return ap
+
+def _probe(args) -> int:
+    from .clean_aggregate import sbsdr_days
+    from .sbsdr_fetch import probe_sbsdr_range
+
+    days = sbsdr_days(args.start, args.end, not args.all_days)
+    found = probe_sbsdr_range(days, max_workers=args.concurrency)
+    mark = {True: "yes", False: "no", None: "?"}
+    for day, ok in found.items():
+        print(f"{day}  {mark[ok]}")
+    n_yes = sum(ok is True for ok in found.values())
+    n_unk = sum(ok is None for ok in found.values())
+    print(f"{n_yes}/{len(found)} days published, {n_unk} unknown")
+    return 0
+
+def main(argv=None) -> int:
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(message)s",
+    )
+    ap = build_parser()
+    args = ap.parse_args(argv)
+    if args.end < args.start:
+        ap.error("--end is before --start")
+    if args.probe:
+        return _probe(args)
+    if not args.out:
+        ap.error("the following arguments are required: --out")
+    # Deferred so --help and argument errors don't pay for pandas/numpy/pyarrow
+    from .clean_aggregate import build_series
+
+    df = build_series(args.start, args.end, agg=args.agg, concurrency=args.concurrency,
+                      cache_dir=args.cache_dir or None,
+                      business_days_only=not args.all_days,
+                      entity=args.entity, currency=args.currency, tenor_years=args.tenor_years,
+                      async_fetch=args.async_fetch)
+    if df.empty:
+        LOG.warning("No CDS data aggregated in the specified range.")
+    outp = pathlib.Path(args.out)
+    outp.parent.mkdir(parents=True, exist_ok=True)
+    df.to_csv(outp, index=False)
+    LOG.info("Wrote %s rows to %s", len(df), outp)
+    return 0
@@ -1,6 +1,5 @@
 # cds_helpers/investing_fetch.py
 
-import datetime as dt
 import pandas as pd
 import requests
 from bs4 import BeautifulSoup
@@ -9,6 +8,21 @@ INVESTING_URL = (
     "https://www.investing.com/rates-bonds/united-states-cds-5-years-usd-historical-data"
 )
 
+# Reused across calls so repeat scrapes skip the TCP/TLS handshake.
+# Site sometimes requires browser-like headers to avoid 403.
+_SESSION = requests.Session()
+_SESSION.headers.update({
+    "User-Agent":
+        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/112.0 Safari/537.36"
+})
+
+try:  # lxml's C parser is several times faster than the stdlib one
+    import lxml  # noqa: F401
+    _PARSER = "lxml"
+except ImportError:
+    _PARSER = "html.parser"
+
 def fetch_investing_history():
     """
     Scrape the full historical table shown on Investing.com for US 5Y CDS.
@@ -17,52 +31,37 @@ def fetch_investing_history():
     - Site sometimes requires headers to avoid 403.
     - We assume US-style mm/dd/yyyy or similar and parse to datetime.date.
     """
-    headers = {
-        "User-Agent":
-            "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
-            "(KHTML, like Gecko) Chrome/112.0 Safari/537.36"
-    }
-    resp = requests.get(INVESTING_URL, headers=headers, timeout=30)
+    resp = _SESSION.get(INVESTING_URL, timeout=30)
     if resp.status_code != 200:
         return pd.DataFrame()
 
-    soup = BeautifulSoup(resp.text, "html.parser")
+    soup = BeautifulSoup(resp.text, _PARSER)
 
     # Heuristic: find table rows in the main historical data table.
-    rows = soup.find_all("tr")
-    data = []
+    rows = soup.select("table tr")
+    date_strs, val_strs = [], []
     for r in rows:
-        cols = r.find_all("td")
+        cols = r.find_all("td", limit=2)
         if len(cols) < 2:
             continue
-        date_txt = cols[0].get_text(strip=True)
-        val_txt = cols[1].get_text(strip=True)
-        # date like "Nov 07, 2025" etc.
-        # try multiple parsers
-        parsed_date = None
-        for fmt in ("%b %d, %Y", "%m/%d/%Y", "%Y-%m-%d"):
-            try:
-                parsed_date = dt.datetime.strptime(date_txt, fmt).date()
-                break
-            except Exception:
-                pass
-        if parsed_date is None:
-            continue
+        date_strs.append(cols[0].get_text(strip=True))
+        val_strs.append(cols[1].get_text(strip=True))
 
-        def to_float(x):
-            x = x.replace(",", "").replace("%", "")
-            try:
-                return float(x)
-            except:
-                return None
-        val = to_float(val_txt)
-        if val is None:
-            continue
+    if not date_strs:
+        return pd.DataFrame()
 
-        data.append({"date": parsed_date, "cds_bps": val})
+    # date like "Nov 07, 2025" etc.; try each format over the whole column
+    raw = pd.Series(date_strs)
+    dates = pd.Series(pd.NaT, index=raw.index, dtype="datetime64[ns]")
+    for fmt in ("%b %d, %Y", "%m/%d/%Y", "%Y-%m-%d"):
+        dates = dates.fillna(pd.to_datetime(raw, format=fmt, errors="coerce"))
+    vals = pd.to_numeric(pd.Series(val_strs).str.replace("[,%]", "", regex=True),
+                         errors="coerce")
 
-    if not data:
+    ok = dates.notna() & vals.notna()
+    if not ok.any():
         return pd.DataFrame()
 
-    out = pd.DataFrame(data).drop_duplicates(subset=["date"]).sort_values("date")
+    out = pd.DataFrame({"date": dates[ok].dt.date, "cds_bps": vals[ok].astype(float)})
+    out = out.drop_duplicates(subset=["date"]).sort_values("date")
     return out.reset_index(drop=True)
@@ -1,14 +1,22 @@
 import io, time, requests
+from requests.adapters import HTTPAdapter, Retry
+
+# One pooled keep-alive session: retries below reuse the TLS connection instead
+# of paying a fresh handshake per attempt. Retrying is done by hand, not urllib3.
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=32, pool_maxsize=32,
+                                       max_retries=Retry(total=0)))
+_SESSION.headers.update({"User-Agent": "cds-pipeline/1.0"})
 
 def _doh_ipv4(host: str, timeout=8) -> list[str]:
     url = f"https://dns.google/resolve?name={host}&type=A"
-    r = requests.get(url, timeout=timeout)
+    r = _SESSION.get(url, timeout=timeout)
     r.raise_for_status()
     js = r.json()
     answers = js.get("Answer", []) or []
     return [a.get("data") for a in answers if a.get("type") == 1 and a.get("data")]
 
-def _curl_with_resolve(url: str, host: str, ip: str, timeout=60) -> str:
+def _curl_handle(url: str, host: str, ip: str, timeout=60):
     import pycurl
     buf = io.BytesIO()
     c = pycurl.Curl()
@@ -19,19 +27,68 @@ def _curl_with_resolve(url: str, host: str, ip: str, timeout=60) -> str:
     c.setopt(pycurl.HTTPHEADER, [f"Host: {host}", "User-Agent: cds-pipeline/1.0"])
     c.setopt(pycurl.RESOLVE, [f"{host}:443:{ip}"])
     c.setopt(pycurl.WRITEDATA, buf)
-    c.perform()
-    code = c.getinfo(pycurl.RESPONSE_CODE)
-    c.close()
-    if 200 <= code < 300:
-        return buf.getvalue().decode("utf-8", errors="replace")
-    raise RuntimeError(f"pycurl fetch got HTTP {code} via {ip}")
+    return c, buf
+
+def _race_ips(url: str, host: str, ips: list[str], timeout=60, stagger=0.3) -> str:
+    """Happy-eyeballs on one CurlMulti: start one transfer per IP, `stagger`
+    seconds apart (or at once when the previous one fails), and return the
+    first success. A blackholed IP costs at most one stagger step instead of a
+    full timeout, and the losers are aborted rather than left running."""
+    import pycurl
+    multi = pycurl.CurlMulti()
+    queue = list(ips)
+    live = {}  # handle -> (ip, buffer)
+    next_start = time.monotonic()
+    last_err = None
+    try:
+        while queue or live:
+            now = time.monotonic()
+            if queue and now >= next_start:
+                ip = queue.pop(0)
+                c, buf = _curl_handle(url, host, ip, timeout=timeout)
+                multi.add_handle(c)
+                live[c] = (ip, buf)
+                next_start = now + stagger
+            while multi.perform()[0] == pycurl.E_CALL_MULTI_PERFORM:
+                pass
+            while True:
+                queued, ok, failed = multi.info_read()
+                for c in ok:
+                    ip, buf = live.pop(c)
+                    multi.remove_handle(c)
+                    code = c.getinfo(pycurl.RESPONSE_CODE)
+                    c.close()
+                    if 200 <= code < 300:
+                        return buf.getvalue().decode("utf-8", errors="replace")
+                    last_err = RuntimeError(f"pycurl fetch got HTTP {code} via {ip}")
+                    next_start = time.monotonic()  # don't sit out the stagger
+                for c, errno, msg in failed:
+                    ip, _ = live.pop(c)
+                    multi.remove_handle(c)
+                    c.close()
+                    last_err = RuntimeError(f"pycurl fetch via {ip} failed: {errno} {msg}")
+                    next_start = time.monotonic()
+                if not queued:
+                    break
+            if live:
+                wait_s = max(0.0, next_start - time.monotonic()) if queue else 1.0
+                if multi.select(min(wait_s, 1.0)) == -1:
+                    time.sleep(min(wait_s, 0.05))
+            elif queue:
+                time.sleep(max(0.0, next_start - time.monotonic()))
+    finally:
+        for c in live:  # losers: abort now instead of running out their timeout
+            multi.remove_handle(c)
+            c.close()
+        multi.close()
+    raise RuntimeError(f"All {len(ips)} IPs failed for {host}") from last_err
 
 def get_url_resilient(url: str, host: str, timeout=60, tries=5, backoff=2.0) -> str:
     last_err = None
     # try direct first
     for attempt in range(tries):
         try:
-            r = requests.get(url, timeout=timeout)
+            r = _SESSION.get(url, timeout=timeout)
             r.raise_for_status()
             return r.text
         except Exception as e:
@@ -52,12 +109,11 @@ def get_url_resilient(url: str, host: str, timeout=60, tries=5, backoff=2.0) ->
     if not ips:
         raise RuntimeError(f"DoH failed for {host}") from last_err
 
-    for ip in ips:
-        for attempt in range(tries):
-            try:
-                return _curl_with_resolve(url, host, ip, timeout=timeout)
-            except Exception as e:
-                last_err = e
-                time.sleep(backoff ** attempt)
+    for attempt in range(tries):
+        try:
+            return _race_ips(url, host, ips, timeout=timeout)
+        except Exception as e:
+            last_err = e
+            time.sleep(backoff ** attempt)
 
     raise RuntimeError(f"All fetch attempts failed for {url}") from last_err
@@ -1,99 +1,150 @@
+import functools
 import re
 import typing as t
 import pandas as pd
 import numpy as np
 
+@functools.lru_cache(maxsize=256)
+def _ci_pattern(token: str) -> re.Pattern:
+    return re.compile(re.escape(token), re.IGNORECASE)
+
 # case-insensitive contains
 def _contains_ci(series: pd.Series, token: str) -> pd.Series:
-    return series.astype(str).str.contains(re.escape(token), case=False, na=False)
+    return series.astype(str).str.contains(_ci_pattern(token), na=False)
 
-def find_entity_column(df: pd.DataFrame) -> str | None:
+@functools.lru_cache(maxsize=32)
+def _col_index(columns: tuple) -> tuple[tuple[tuple[str, str], ...], dict[str, str]]:
     """
-    Try a set of likely columns that carry the reference entity / underlier.
+    (original, lowercased) pairs plus a lowercase -> original map, built once per
+    header tuple and shared by every finder below.
     """
-    LOWER = {c.lower(): c for c in df.columns}
-    candidates = [c for c in df.columns if any(
-        k in c.lower()
-        for k in ["reference", "underlier", "underlying", "entity", "name", "obligor"]
-    )]
+    pairs = tuple((c, c.lower()) for c in columns)
+    return pairs, {lc: c for c, lc in pairs}
+
+# Substrings the finders fall back to, each mapped to the first column containing it
+_FALLBACK_TOKENS = ("curr", "tenor", "price", "pricenotation", "notional")
+
+@functools.lru_cache(maxsize=32)
+def _first_containing(columns: tuple) -> dict[str, str]:
+    """One pass over the lowercased headers for every fallback token at once."""
+    pairs, _ = _col_index(columns)
+    first: dict[str, str] = {}
+    for c, lc in pairs:
+        for tok in _FALLBACK_TOKENS:
+            if tok in lc:
+                first.setdefault(tok, c)
+    return first
+
+# SBSDR headers are stable across days, so every name-only lookup below is
+# resolved once per distinct header tuple instead of once per DataFrame.
+# Decorated finders are written against the header tuple; callers still pass df.
+def _per_schema(fn):
+    cached = functools.lru_cache(maxsize=32)(fn)
+
+    @functools.wraps(fn)
+    def wrapper(df: pd.DataFrame):
+        return cached(tuple(df.columns))
+    return wrapper
+
+ENTITY_SAMPLE_ROWS = 10_000
+
+@functools.lru_cache(maxsize=32)
+def _entity_names(columns: tuple) -> tuple[str | None, tuple[str, ...]]:
+    pairs, LOWER = _col_index(columns)
     # Prefer more specific names first
     prio = ["referenceentityname", "referenceentity", "underliername", "underlyingname",
             "entityname", "name"]
     for p in prio:
         if p in LOWER:
-            return LOWER[p]
+            return LOWER[p], ()
+    candidates = tuple(c for c, lc in pairs if any(
+        k in lc
+        for k in ["reference", "underlier", "underlying", "entity", "name", "obligor"]
+    ))
+    return None, candidates
+
+def find_entity_column(df: pd.DataFrame) -> str | None:
+    """
+    Try a set of likely columns that carry the reference entity / underlier.
+    """
+    hit, candidates = _entity_names(tuple(df.columns))
+    if hit is not None:
+        return hit
+    if len(candidates) == 1:
+        return candidates[0]
     if candidates:
-        # Choose the one with the most distinct values (likely the RE name)
-        return max(candidates, key=lambda c: df[c].nunique(dropna=True))
+        # Choose the one with the most distinct values (likely the RE name); the
+        # head of a day's file is representative, so rank on a sample
+        sample = df.head(ENTITY_SAMPLE_ROWS)
+        return max(candidates, key=lambda c: sample[c].nunique(dropna=True))
     return None
 
-def find_asset_class_column(df: pd.DataFrame) -> str | None:
-    LOWER = {c.lower(): c for c in df.columns}
+@functools.lru_cache(maxsize=32)
+def _asset_class_name(columns: tuple) -> str | None:
+    _, LOWER = _col_index(columns)
     for key in ["assetclass", "productclass", "productclassification", "assetClass"]:
         if key.lower() in LOWER:
             return LOWER[key.lower()]
+    return None
+
+def find_asset_class_column(df: pd.DataFrame) -> str | None:
+    hit = _asset_class_name(tuple(df.columns))
+    if hit is not None:
+        return hit
     # Heuristic: a column that often says 'CDS' or 'Credit'
     for c in df.columns:
-        if df[c].astype(str).str.contains("CDS|Credit", case=False, na=False).any():
+        s = df[c].astype(str).str.lower()
+        if (s.str.contains("cds", regex=False, na=False)
+                | s.str.contains("credit", regex=False, na=False)).any():
             return c
     return None
 
-def find_currency_column(df: pd.DataFrame) -> str | None:
-    LOWER = {c.lower(): c for c in df.columns}
+@_per_schema
+def find_currency_column(columns: tuple) -> str | None:
+    _, LOWER = _col_index(columns)
     for key in ["currency", "notionalcurrency", "pricecurrency", "sbsnotionalcurrency"]:
         if key in LOWER:
             return LOWER[key]
     # fallback: any col named like *currency*
-    for c in df.columns:
-        if "curr" in c.lower():
-            return c
-    return None
+    return _first_containing(columns).get("curr")
 
-def find_tenor_column(df: pd.DataFrame) -> str | None:
-    LOWER = {c.lower(): c for c in df.columns}
+@_per_schema
+def find_tenor_column(columns: tuple) -> str | None:
+    _, LOWER = _col_index(columns)
     for key in ["tenor", "maturitytenor", "contracttenor", "underlierTenor"]:
         if key.lower() in LOWER:
             return LOWER[key.lower()]
-    for c in df.columns:
-        if "tenor" in c.lower():
-            return c
-    return None
+    return _first_containing(columns).get("tenor")
 
-def find_price_column(df: pd.DataFrame) -> str | None:
+@_per_schema
+def find_price_column(columns: tuple) -> str | None:
     """
     We want the CDS spread if present (often 'price' with unit BPS or a 'priceNotation' field).
     """
+    pairs, _ = _col_index(columns)
     # Strong candidates
-    for name in df.columns:
-        nl = name.lower()
+    for name, nl in pairs:
         if nl in ["price", "pricenotationvalue", "price_notation_value", "reportedprice"]:
             return name
     # generic fallback: any col with 'price' substring
-    for name in df.columns:
-        if "price" in name.lower():
-            return name
-    return None
+    return _first_containing(columns).get("price")
 
-def find_price_unit_column(df: pd.DataFrame) -> str | None:
-    for name in df.columns:
-        if "unit" in name.lower() and "price" in name.lower():
-            return name
-        if "price" in name.lower() and "type" in name.lower():
+@_per_schema
+def find_price_unit_column(columns: tuple) -> str | None:
+    pairs, _ = _col_index(columns)
+    for name, nl in pairs:
+        if "price" in nl and ("unit" in nl or "type" in nl):
             return name
     # Some feeds carry 'priceNotationType' or 'priceNotation'
-    for name in df.columns:
-        if "pricenotation" in name.lower():
-            return name
-    return None
+    return _first_containing(columns).get("pricenotation")
 
-def find_notional_column(df: pd.DataFrame) -> str | None:
-    for name in df.columns:
-        if "notional" in name.lower() and "amount" in name.lower():
+@_per_schema
+def find_notional_column(columns: tuple) -> str | None:
+    pairs, _ = _col_index(columns)
+    for name, nl in pairs:
+        if "notional" in nl and "amount" in nl:
             return name
-    for name in df.columns:
-        if "notional" in name.lower():
-            return name
-    return None
+    return _first_containing(columns).get("notional")
 
 def normalize_price_to_bps(price: pd.Series, unit_col: str | None, df: pd.DataFrame) -> pd.Series:
     """
@@ -102,13 +153,9 @@ def normalize_price_to_bps(price: pd.Series, unit_col: str | None, df: pd.DataFr
     p = pd.to_numeric(price, errors="coerce")
     if unit_col and unit_col in df.columns:
         u = df[unit_col].astype(str).str.lower()
-        # common patterns
-        is_bps = u.str.contains("bp|bps|basis", na=False)
-        is_pct = u.str.contains("%|percent|pct", na=False)
-        # If explicitly bps, keep as-is
-        p = np.where(is_bps, p, p)
-        # If percent and values look like 0-100, we cannot convert reliably to bps spread for CDS upfront -> set NaN
-        p = pd.Series(p)
-        p[is_pct] = np.nan
-        return p
+        # Explicit bps is kept as-is. If percent and values look like 0-100, we cannot
+        # convert reliably to bps spread for CDS upfront -> set NaN
+        is_pct = u.str.contains("%|percent|pct", na=False).to_numpy()
+        return pd.Series(np.where(is_pct, np.nan, p.to_numpy(dtype=np.float64, na_value=np.nan)),
+                         index=price.index)
     return p
@@ -1,9 +1,16 @@
 # cds_helpers/sbsdr_fetch.py
 from __future__ import annotations
-import io, os, socket, time, logging
-from typing import Optional
+import datetime as dt
+import functools, gzip, io, os, pathlib, socket, threading, time, logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, Optional, Tuple
 import requests
 from requests.adapters import HTTPAdapter, Retry
+try:
+    import httpx
+    import h2  # noqa: F401 -- httpx refuses http2=True without it
+except ImportError:
+    httpx = None
 
 LOG = logging.getLogger("SBSR")
 
@@ -13,19 +20,67 @@ ICE_HOSTS = [
 ]
 ICE_PATH = "/trade-reporting/api/v1/public-data/sbs-transaction-csv"
 
+# Raw daily CSVs are immutable once a trading day has settled, so we keep them on disk.
+CACHE_DIR = pathlib.Path(os.environ.get("CDS_CACHE_DIR", "data/raw"))
+FRESH_DAYS = 1             # days before today that may still be amended upstream
+CACHE_TTL = 24 * 3600      # seconds a cached copy of such a recent day stays valid
+
+# Process-wide cap on live requests to ICE, however many threads or concurrent
+# ranges are fetching; cache hits never take a slot.
+MAX_INFLIGHT = int(os.environ.get("CDS_MAX_INFLIGHT", "16"))
+_INFLIGHT = threading.BoundedSemaphore(MAX_INFLIGHT)
+
 SESSION = requests.Session()
 retries = Retry(
-    total=2, connect=2, read=2, backoff_factor=0.8,
+    total=2, connect=2, read=2, backoff_factor=0.25,  # transient 5xx clear fast
     status_forcelist=(429, 500, 502, 503, 504),
     allowed_methods=frozenset(["GET"]),
 )
-SESSION.mount("https://", HTTPAdapter(max_retries=retries))
+# One pool per host (ICE, DoH resolvers, reader proxy), each big enough for the
+# default 16 fetch threads: at urllib3's default of 10, surplus connections were
+# discarded after each request and the next fetch paid a fresh TLS handshake.
+SESSION.mount("https://", HTTPAdapter(pool_connections=8, pool_maxsize=32,
+                                      max_retries=retries))
 SESSION.headers.update({
     "User-Agent": "CDS-data/1.0 (academic; contact: student@university.edu)",
     "Accept": "*/*",
+    # CSV compresses 5-10x on the wire. Pinned rather than left to requests'
+    # default, which grows br/zstd whenever urllib3 can decode them and would
+    # then be copied into sessions (aiohttp) that can't.
+    "Accept-Encoding": "gzip, deflate",
 })
 
+# With httpx[http2] installed, direct ICE fetches from every thread share one
+# multiplexed HTTP/2 connection per host instead of one HTTP/1.1 socket each.
+# Sized like the in-flight cap so that, should ALPN settle on HTTP/1.1, no
+# fetch thread queues for a connection; the route is then dropped anyway.
+H2_CLIENT = httpx.Client(
+    http2=True, timeout=25, headers=dict(SESSION.headers), default_encoding="utf-8",
+    limits=httpx.Limits(max_connections=MAX_INFLIGHT,
+                        max_keepalive_connections=MAX_INFLIGHT),
+) if httpx else None
+_H2_OFF = threading.Event()  # set once a server answered without HTTP/2
+
+DOH_TTL = 300.0  # seconds a DoH answer is reused across days and threads
+_DOH_CACHE: dict[str, tuple[float, list[str]]] = {}
+_DOH_LOCK = threading.Lock()
+
 def _doh_resolve(host: str) -> list[str]:
+    """
+    Resolve host via DNS-over-HTTPS, reusing a non-empty answer for DOH_TTL
+    seconds so a backfill doesn't re-query the resolvers for every day.
+    """
+    with _DOH_LOCK:
+        hit = _DOH_CACHE.get(host)
+    if hit and time.monotonic() < hit[0]:
+        return list(hit[1])
+    ips = _doh_query(host)
+    if ips:
+        with _DOH_LOCK:
+            _DOH_CACHE[host] = (time.monotonic() + DOH_TTL, ips)
+    return ips
+
+def _doh_query(host: str) -> list[str]:
     """Resolve host via DNS-over-HTTPS (Cloudflare first, then Google)."""
     heads = {"accept": "application/dns-json"}
     ips: list[str] = []
@@ -45,16 +100,62 @@ def _doh_resolve(host: str) -> list[str]:
 def _as_text(resp: requests.Response) -> str:
     resp.raise_for_status()
     # If the server returns bytes (CSV), .text is fine because it’s ASCII/UTF-8.
+    # Without a declared charset requests would otherwise run charset detection
+    # over the whole multi-MB body on every .text access.
+    if resp.encoding is None:
+        resp.encoding = "utf-8"
     return resp.text
 
+class NotPublished(Exception):
+    """ICE answered 404 for the day: no file exists, so no other route will find one."""
+
+class Unreachable(Exception):
+    """No connection to the host at all: the plain direct route would fail the same way."""
+
+# Days ICE answered 404 for in this process. The fetchers return None both for
+# those and for days every route failed on; callers that persist results must
+# tell the two apart.
+_NOT_PUBLISHED: set[str] = set()
+
+def not_published(day: str) -> bool:
+    """True if the last answer for `day` was a 404 rather than a failed fetch."""
+    return day in _NOT_PUBLISHED
+
 def _try_direct(host: str, day: str) -> Optional[str]:
     url = f"https://{host}{ICE_PATH}"
     try:
-        return _as_text(SESSION.get(url, params={"tradeDate": day}, timeout=25))
+        resp = SESSION.get(url, params={"tradeDate": day}, timeout=25)
+        LOG.debug("%s %s: Content-Encoding=%s", host, day,
+                  resp.headers.get("Content-Encoding", "identity"))
+        if resp.status_code == 404:
+            raise NotPublished(f"{host} has no file for {day}")
+        return _as_text(resp)
     except requests.exceptions.RequestException as e:
         LOG.warning("Direct fetch from %s failed: %s", host, repr(e))
         return None
 
+def _try_direct_h2(host: str, day: str) -> Optional[str]:
+    if _H2_OFF.is_set():
+        return None
+    url = f"https://{host}{ICE_PATH}"
+    try:
+        resp = H2_CLIENT.get(url, params={"tradeDate": day})
+        LOG.debug("%s %s: %s, Content-Encoding=%s", host, day, resp.http_version,
+                  resp.headers.get("Content-Encoding", "identity"))
+        if resp.http_version != "HTTP/2" and not _H2_OFF.is_set():
+            # Nothing to multiplex: leave direct fetches to the requests pool
+            LOG.info("%s answered over %s; not using the HTTP/2 client", host, resp.http_version)
+            _H2_OFF.set()
+        if resp.status_code == 404:
+            raise NotPublished(f"{host} has no file for {day}")
+        resp.raise_for_status()
+        return resp.text
+    except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+        raise Unreachable(f"{host}: {e!r}") from e
+    except httpx.HTTPError as e:
+        LOG.warning("HTTP/2 fetch from %s failed: %s", host, repr(e))
+        return None
+
 def _try_doh_ip(host: str, day: str) -> Optional[str]:
     ips = _doh_resolve(host)
     if not ips:
@@ -71,8 +172,10 @@ def _try_doh_ip(host: str, day: str) -> Optional[str]:
                 url, params={"tradeDate": day}, timeout=25,
                 headers={"Host": host}, verify=False  # cert CN won't match IP
             )
-            if resp.status_code == 200 and resp.text.strip():
-                return resp.text
+            if resp.status_code == 200:
+                txt = _as_text(resp)
+                if txt.strip():
+                    return txt
         except requests.exceptions.RequestException:
             continue
     LOG.warning("All DoH/IP attempts failed for %s", host)
@@ -83,9 +186,7 @@ def _try_reader_proxy(host: str, day: str) -> Optional[str]:
     # Even for HTTPS origins, the reader fetcher accepts http-scheme wrapping.
     reader = f"https://r.jina.ai/http://{host}{ICE_PATH}?tradeDate={day}"
     try:
-        r = SESSION.get(reader, timeout=30)
-        r.raise_for_status()
-        txt = r.text
+        txt = _as_text(SESSION.get(reader, timeout=30))
         # r.jina.ai sometimes prepends the URL/title lines; CSV always has commas and header row.
         if "," in txt and ("tradeDate" in txt or "execution" in txt.lower() or "asset" in txt.lower()):
             return txt
@@ -93,22 +194,161 @@ def _try_reader_proxy(host: str, day: str) -> Optional[str]:
         LOG.warning("%s reader proxy failed: %s", host, repr(e))
     return None
 
-def fetch_sbsdr_day(day: str) -> Optional[str]:
+# Routes tried in order for each ICE host: (label, transport(host, day) -> text or None)
+TRANSPORTS: Tuple[Tuple[str, Callable[[str, str], Optional[str]]], ...] = (
+    *((("HTTP/2", _try_direct_h2),) if H2_CLIENT else ()),
+    ("direct", _try_direct),
+    ("DoH/IP", _try_doh_ip),
+    ("proxy reader", _try_reader_proxy),
+)
+
+def fetch_sbsdr_day(day: str, transports=TRANSPORTS) -> Optional[str]:
     """
     Return the raw CSV text for the given day, or None if unavailable.
+    Each host is tried over `transports` in order; the first non-empty answer wins.
+    At most MAX_INFLIGHT of these run at once across all threads.
+    """
+    with _INFLIGHT:
+        for host in ICE_HOSTS:
+            unreachable = False
+            for label, transport in transports:
+                if unreachable and transport is _try_direct:
+                    continue
+                LOG.info("[SBSR] Fetch %s via %s %s", day, label, host)
+                try:
+                    t = transport(host, day)
+                except NotPublished as e:
+                    # A definitive answer: skip the DoH/proxy/mirror routes
+                    LOG.info("%s: not published (%s)", day, e)
+                    _NOT_PUBLISHED.add(day)
+                    return None
+                except Unreachable as e:
+                    # DNS/connect failure: straight on to the DoH/IP route
+                    LOG.warning("Direct connection failed: %s", e)
+                    unreachable = True
+                    continue
+                if t:
+                    _NOT_PUBLISHED.discard(day)
+                    return t
+
+    LOG.warning("%s: fetch error: All hosts failed for %s", day, day)
+    return None
+
+def probe_day(day: str) -> Optional[bool]:
     """
-    for host in ICE_HOSTS:
-        LOG.info("[SBSR] Fetch %s via direct %s", day, host)
-        t = _try_direct(host, day)
-        if t: return t
+    Is a file published for `day`? HEAD only, so nothing is downloaded: True on
+    200, False on 404, None if no host gave a definitive answer. Servers that
+    refuse HEAD (405) get a streamed GET whose body is never read.
+    """
+    with _INFLIGHT:
+        for host in ICE_HOSTS:
+            url = f"https://{host}{ICE_PATH}"
+            try:
+                resp = SESSION.head(url, params={"tradeDate": day}, timeout=10,
+                                    allow_redirects=True)
+                if resp.status_code == 405:
+                    with SESSION.get(url, params={"tradeDate": day}, timeout=10,
+                                     stream=True) as resp:
+                        pass
+                if resp.status_code == 200:
+                    return True
+                if resp.status_code == 404:
+                    return False
+                LOG.warning("Probe of %s on %s got HTTP %s", day, host, resp.status_code)
+            except requests.exceptions.RequestException as e:
+                LOG.warning("Probe of %s on %s failed: %s", day, host, repr(e))
+    return None
 
-        LOG.warning("DNS/direct failed for %s: trying DoH/IP route", host)
-        t = _try_doh_ip(host, day)
-        if t: return t
+def _cache_path(day: str, cache_dir) -> pathlib.Path:
+    return pathlib.Path(cache_dir) / day[:4] / day[:7] / f"{day}.csv.gz"
 
-        LOG.info("[SBSR] Fetch %s via proxy reader for %s", day, host)
-        t = _try_reader_proxy(host, day)
-        if t: return t
+def _cache_valid(path: pathlib.Path, day: str) -> bool:
+    """Settled days never expire; recent ones live CACHE_TTL; today is always re-fetched."""
+    if not path.exists():
+        return False
+    d, today = dt.date.fromisoformat(day), dt.date.today()
+    if d >= today:
+        return False  # may still update intraday
+    if d < today - dt.timedelta(days=FRESH_DAYS):
+        return True
+    return time.time() - path.stat().st_mtime < CACHE_TTL
 
-    LOG.warning("%s: fetch error: All hosts failed for %s", day, day)
+def _read_cache(path: pathlib.Path) -> Optional[str]:
+    try:
+        return gzip.decompress(path.read_bytes()).decode("utf-8", errors="replace")
+    except (OSError, EOFError) as e:
+        LOG.warning("Unreadable cache file %s: %s", path, repr(e))
+        return None
+
+def _write_cache(path: pathlib.Path, text: str) -> None:
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        # Level 3: most of level 9's ratio on CSV text at a fraction of the CPU
+        tmp.write_bytes(gzip.compress(text.encode("utf-8"), compresslevel=3))
+        os.replace(tmp, path)  # atomic: readers never see a half-written file
+    except OSError as e:
+        LOG.warning("Could not write cache file %s: %s", path, repr(e))
+
+def cached_fetch_sbsdr_day(day: str, cache_dir=CACHE_DIR) -> Optional[str]:
+    """
+    fetch_sbsdr_day with a gzip-CSV cache under cache_dir/{YYYY}/{YYYY-MM}/{day}.csv.gz.
+    Settled days are served from disk without any HTTP request; recent days are
+    served from disk for CACHE_TTL, then re-fetched, falling back to the stale
+    cached copy if the fetch fails.
+    """
+    path = _cache_path(day, cache_dir)
+    if _cache_valid(path, day):
+        txt = _read_cache(path)
+        if txt:
+            return txt
+
+    txt = fetch_sbsdr_day(day)
+    if txt:
+        _write_cache(path, txt)
+        return txt
+
+    if path.exists():
+        LOG.warning("%s: fetch failed, serving stale cache %s", day, path)
+        return _read_cache(path)
     return None
+
+def _safe_fetch(fetch, day: str) -> Optional[str]:
+    # One bad day must not abort the whole range
+    try:
+        return fetch(day)
+    except Exception as e:
+        LOG.warning("%s: fetch error: %s", day, repr(e))
+        return None
+
+def iter_sbsdr_days(days: Iterable[str], max_workers: int = 16,
+                    cache_dir=CACHE_DIR) -> Iterator[Tuple[str, Optional[str]]]:
+    """
+    Yield (day, raw CSV text or None) in the order given, while up to
+    `max_workers` threads fetch ahead. The fetch is IO-bound and releases the
+    GIL, and unlike asyncio.run this also works inside a running event loop.
+    Pass cache_dir=None to bypass the disk cache.
+    """
+    days = list(days)
+    if cache_dir:
+        fetch = functools.partial(cached_fetch_sbsdr_day, cache_dir=cache_dir)
+    else:
+        fetch = fetch_sbsdr_day
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as ex:
+        yield from zip(days, ex.map(functools.partial(_safe_fetch, fetch), days))
+
+def fetch_sbsdr_range(days: Iterable[str], concurrency: int = 16,
+                      cache_dir=CACHE_DIR) -> dict[str, Optional[str]]:
+    """
+    Return {day: raw CSV text or None} for a batch of days.
+    The ICE endpoint serves exactly one tradeDate per request, so a range is a
+    batch of concurrent per-day requests (at most `concurrency` in flight)
+    rather than a single download.
+    """
+    return dict(iter_sbsdr_days(days, concurrency, cache_dir))
+
+def probe_sbsdr_range(days: Iterable[str], max_workers: int = 16) -> dict[str, Optional[bool]]:
+    """{day: probe_day(day)} with up to `max_workers` HEAD requests in flight."""
+    days = list(days)
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as ex:
+        return dict(zip(days, ex.map(probe_day, days)))
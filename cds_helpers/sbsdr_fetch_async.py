@@ -0,0 +1,89 @@
+# cds_helpers/sbsdr_fetch_async.py
+"""
+Optional aiohttp fast path for bulk SBSDR downloads (requires aiohttp).
+
+One event loop multiplexes every in-flight request over a shared keep-alive
+connector instead of parking one OS thread per fetch. Only the direct ICE
+route runs on the loop; a day it can't get goes to the regular
+fetch_sbsdr_day chain (DoH/IP, reader proxy) on a worker thread.
+"""
+from __future__ import annotations
+import asyncio, logging
+from typing import Iterable, Optional
+import aiohttp
+
+from .sbsdr_fetch import (
+    CACHE_DIR, ICE_HOSTS, ICE_PATH, SESSION, NotPublished, _NOT_PUBLISHED,
+    _cache_path, _cache_valid, _read_cache, _write_cache, fetch_sbsdr_day,
+)
+
+LOG = logging.getLogger("SBSR")
+
+async def _get(session: aiohttp.ClientSession, url: str, day: str) -> Optional[str]:
+    try:
+        async with session.get(url, params={"tradeDate": day}) as resp:
+            if resp.status == 404:
+                raise NotPublished(f"{url} has no file for {day}")
+            if resp.status != 200:
+                LOG.warning("Async fetch of %s from %s got HTTP %s", day, url, resp.status)
+                return None
+            txt = await resp.text(errors="replace")
+            return txt if txt.strip() else None
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        LOG.warning("Async fetch of %s from %s failed: %s", day, url, repr(e))
+        return None
+
+async def fetch_day_async(session: aiohttp.ClientSession, day: str) -> Optional[str]:
+    """Raw CSV text for one day, or None if every route failed."""
+    for host in ICE_HOSTS:
+        try:
+            txt = await _get(session, f"https://{host}{ICE_PATH}", day)
+        except NotPublished as e:
+            LOG.info("%s: not published (%s)", day, e)
+            _NOT_PUBLISHED.add(day)
+            return None
+        if txt:
+            _NOT_PUBLISHED.discard(day)
+            return txt
+    # The slow fallbacks stay on the sync chain, off the event loop
+    return await asyncio.to_thread(fetch_sbsdr_day, day)
+
+async def fetch_range_async(days: Iterable[str], concurrency: int = 16) -> dict[str, Optional[str]]:
+    """{day: raw CSV text or None}, with at most `concurrency` requests in flight."""
+    sem = asyncio.Semaphore(max(1, concurrency))
+    connector = aiohttp.TCPConnector(limit=max(1, concurrency), ttl_dns_cache=300,
+                                     keepalive_timeout=60)
+    async with aiohttp.ClientSession(connector=connector,
+                                     timeout=aiohttp.ClientTimeout(total=30),
+                                     headers=dict(SESSION.headers)) as session:
+        async def one(day: str):
+            async with sem:
+                return day, await fetch_day_async(session, day)
+        return dict(await asyncio.gather(*(one(d) for d in days)))
+
+def fetch_many(days: Iterable[str], concurrency: int = 16,
+               cache_dir=CACHE_DIR) -> dict[str, Optional[str]]:
+    """
+    Synchronous wrapper: serve what the disk cache holds, fetch the rest on one
+    event loop and write it back, so a later build_series over the same days
+    never touches the network. Same cache rules as cached_fetch_sbsdr_day.
+    Must not be called from inside a running event loop.
+    """
+    days = list(days)
+    out: dict[str, Optional[str]] = {}
+    if cache_dir:
+        for d in days:
+            path = _cache_path(d, cache_dir)
+            if _cache_valid(path, d):
+                out[d] = _read_cache(path)
+    todo = [d for d in days if not out.get(d)]
+    fetched = asyncio.run(fetch_range_async(todo, concurrency)) if todo else {}
+    for d, txt in fetched.items():
+        path = _cache_path(d, cache_dir) if cache_dir else None
+        if txt and path:
+            _write_cache(path, txt)
+        elif not txt and path and path.exists():
+            LOG.warning("%s: fetch failed, serving stale cache %s", d, path)
+            txt = _read_cache(path)
+        out[d] = txt
+    return {d: out.get(d) for d in days}